@@ -1,15 +1,20 @@
 import os
+import errno
 import shutil
 import time
 import logging
+import logging.handlers
+import queue
+import atexit
 import threading
 import concurrent.futures
+import itertools
 import sys
 import re
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from PyQt5 import QtWidgets, QtGui
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import QTimer, Qt, QObject, pyqtSignal
 from PyQt5.QtNetwork import QLocalSocket, QLocalServer
 
 # 获取资源路径（兼容 PyInstaller 打包）
@@ -26,9 +31,18 @@ log_folder = os.path.join(os.path.expanduser('~'), 'Documents', '文件转移工
 os.makedirs(log_folder, exist_ok=True)
 log_file_path = os.path.join(log_folder, 'file_mover.log')
 
-# 日志配置
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
-                    filename=log_file_path, filemode='a')
+# 日志配置：各线程只把记录放入队列，由后台监听线程统一写文件
+# 改为 logging.DEBUG 可记录每个文件的转移明细
+log_level = logging.INFO
+log_queue = queue.Queue(-1)
+log_file_handler = logging.handlers.RotatingFileHandler(log_file_path, mode='a',
+                                                        maxBytes=10 * 1024 * 1024, backupCount=3)
+log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler)
+logging.getLogger().setLevel(log_level)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener.start()
+atexit.register(log_listener.stop)
 
 # 全局参数
 source_folder = ""
@@ -38,46 +52,194 @@ stability_check_interval = 2  # seconds
 stability_check_attempts = 3
 retry_delay = 3
 retry_attempts = 3
+max_retry_delay = 10  # 单次重试等待上限（秒）
+batch_failure_ratio = 0.5  # 一批中失败比例超过该值则暂停本批剩余文件
+batch_failure_min_samples = 20
+batch_pause_delay = 30  # 暂停后剩余文件延后多少秒重新尝试
 
 stop_event = threading.Event()
-allowed_extensions = []
+allowed_extensions = frozenset()
 all_files_selected = True
 folders_selected = True
 
-file_type_map = {
+file_type_map = {k: frozenset(v) for k, v in {
     '音频文件': ['.mp3', '.wav', '.aac', '.flac', '.ogg', '.m4a'],
     '图片文件': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.svg', '.heic'],
     '视频文件': ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm'],
     '压缩文件': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz']
-}
+}.items()}
+# 扩展名 -> 类型标签，预览统计时一次字典查找即可
+EXT_TO_LABEL = {ext: label for label, exts in file_type_map.items() for ext in exts}
+
+# 整理目标文件夹用的分类后缀
+video_ext = ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm']
+image_ext = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.svg', '.heic']
+archive_ext = ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz']
+doc_ext = ['.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.txt', '.rtf']
+audio_ext = ['.mp3', '.wav', '.aac', '.flac', '.ogg', '.m4a']
+
+# 扩展名 -> 分类，后出现的分类不覆盖前面的（与原先 if/elif 顺序一致）
+EXT_TO_CAT = {}
+for _cat, _exts in (('video', video_ext), ('image', image_ext), ('archive', archive_ext),
+                    ('document', doc_ext), ('audio', audio_ext)):
+    for _ext in _exts:
+        EXT_TO_CAT.setdefault(_ext, _cat)
+
+# 本进程已确认存在的目录，命中时不再做任何系统调用
+_created_dirs = set()
+_created_dirs_lock = threading.Lock()
+
 def ensure_directory_exists(path):
-    if os.path.isfile(path):
-        logging.warning(f"路径已存在为文件，不能创建目录：{path}")
+    if path in _created_dirs:
         return
-    if not os.path.exists(path):
-        os.makedirs(path)
+    with _created_dirs_lock:
+        if path in _created_dirs:
+            return
+        try:
+            os.makedirs(path, exist_ok=True)
+        except FileExistsError:
+            logging.warning(f"路径已存在为文件，不能创建目录：{path}")
+            return
+        _created_dirs.add(path)
+
+def forget_directory(path):
+    # 目录可能已被外部删除，下次 ensure_directory_exists 时重新创建
+    with _created_dirs_lock:
+        _created_dirs.discard(path)
+
+if sys.platform == 'win32':
+    import ctypes
+    from ctypes import wintypes
+    _MoveFileExW = ctypes.WinDLL('kernel32', use_last_error=True).MoveFileExW
+    _MoveFileExW.argtypes = (wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD)
+    _MoveFileExW.restype = wintypes.BOOL
+MOVEFILE_COPY_ALLOWED = 0x2
+SENDFILE_CHUNK = 4 * 1024 * 1024
+
+def _fast_cross_device_move(src, dst):
+    # 跨分区移动文件：Windows 交给 MoveFileExW 在内核中完成，Linux 用 sendfile 零拷贝
+    if sys.platform == 'win32':
+        if not _MoveFileExW(src, dst, MOVEFILE_COPY_ALLOWED):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return
+    with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+        try:
+            offset = 0
+            while True:
+                sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, SENDFILE_CHUNK)
+                if sent == 0:
+                    break
+                offset += sent
+        except Exception:
+            fdst.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+    os.unlink(src)
+
+def _rename_no_clobber(src, dst):
+    # 目标已存在时抛出 FileExistsError，绝不覆盖
+    if sys.platform == 'win32':
+        os.rename(src, dst)  # Windows 上目标存在即失败
+        return
+    if not os.path.isdir(src):
+        try:
+            os.link(src, dst)  # 目标存在时 EEXIST
+        except OSError as e:
+            if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP):
+                raise
+        else:
+            os.unlink(src)
+            return
+    # 目录或不支持硬链接的文件系统：先检查再重命名
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "目标已存在", dst)
+    os.rename(src, dst)
+
+def fast_move(src, dst):
+    # 同一分区直接重命名（单次系统调用），跨分区再退回复制；目标已存在时不覆盖
+    try:
+        _rename_no_clobber(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        if os.path.isdir(src) or not (sys.platform == 'win32' or sys.platform.startswith('linux')):
+            if os.path.lexists(dst):
+                raise FileExistsError(errno.EEXIST, "目标已存在", dst)
+            shutil.move(src, dst)
+        else:
+            _fast_cross_device_move(src, dst)
 
 def is_temporary_file(file_path):
-    return file_path.endswith('.tmp') or file_path.endswith('.crdownload')
+    return file_path.endswith(('.tmp', '.crdownload', '.part'))
+
+# 待确认稳定性的文件：path -> (目标路径, 快照, 下次检查时间, 已连续稳定次数)
+pending_files = {}
+pending_lock = threading.Lock()
 
-def is_file_stable(file_path):
+def snapshot_stat(entry):
+    # entry 可为 DirEntry（复用 scandir 已取得的属性）或路径
+    st = entry.stat() if isinstance(entry, os.DirEntry) else os.stat(entry)
+    return st.st_size, st.st_mtime_ns
+
+def defer_stability_check(file_path, dest_path, entry=None):
+    # 记录一次快照后立即返回，由 process_pending_files 到期复查，不阻塞线程
     if is_temporary_file(file_path):
         logging.info(f"跳过临时文件: {file_path}")
-        return False
+        return
+    with pending_lock:
+        if file_path in pending_files:
+            return
     try:
-        for _ in range(stability_check_attempts):
-            initial_size = os.path.getsize(file_path)
-            time.sleep(stability_check_interval)
-            current_size = os.path.getsize(file_path)
-            if initial_size != current_size:
-                return False
-        return True
+        snapshot = snapshot_stat(entry if entry is not None else file_path)
     except FileNotFoundError:
         logging.error(f"稳定性检测时找不到文件: {file_path}")
-        return False
+        return
     except Exception as e:
         logging.error(f"文件稳定性检测异常: {file_path}, 错误: {e}")
-        return False
+        return
+    with pending_lock:
+        pending_files.setdefault(file_path, (dest_path, snapshot, time.monotonic() + stability_check_interval, 0))
+
+def requeue_pending_file(file_path, dest_path, delay):
+    # 已确认稳定但本批未处理的文件放回待检测队列，delay 秒后再次转移
+    try:
+        snapshot = snapshot_stat(file_path)
+    except OSError:
+        return
+    with pending_lock:
+        pending_files.setdefault(file_path, (dest_path, snapshot, time.monotonic() + delay,
+                                             max(stability_check_attempts - 1, 0)))
+
+def collect_stable_files():
+    now = time.monotonic()
+    with pending_lock:
+        due = [(path, info) for path, info in pending_files.items() if info[2] <= now]
+
+    stable = []
+    for path, (dest_path, snapshot, _, hits) in due:
+        try:
+            current = snapshot_stat(path)
+        except Exception as e:
+            if isinstance(e, FileNotFoundError):
+                logging.error(f"稳定性检测时找不到文件: {path}")
+            else:
+                logging.error(f"文件稳定性检测异常: {path}, 错误: {e}")
+            with pending_lock:
+                pending_files.pop(path, None)
+            continue
+
+        # 大小或修改时间有变化则重新计数
+        hits = hits + 1 if current == snapshot else 0
+        with pending_lock:
+            if path not in pending_files:
+                continue  # 已被其他线程处理
+            if hits >= stability_check_attempts:
+                del pending_files[path]
+                stable.append((path, dest_path))
+            else:
+                pending_files[path] = (dest_path, current, now + stability_check_interval, hits)
+    return stable
 
 def sanitize_filename(filename):
     base, ext = os.path.splitext(filename)
@@ -85,108 +247,335 @@ def sanitize_filename(filename):
         base = base[:max_filename_length]
     return f"{base}{ext}"
 
-def truncate_path(path):
-    base, ext = os.path.splitext(path)
-    if len(base) > max_filename_length - len(ext):
-        base = base[:max_filename_length - len(ext)]
-    return f"{base}{ext}"
+_SEPS = os.sep + (os.altsep or '')
+
+def _make_dest(rel_path, dst_root, max_len):
+    # 拼接目标路径并按长度截断，一次 splitext 完成（等价于先 sanitize 再 truncate）
+    # rel_path 已知是相对路径，直接拼接比 os.path.join 省去逐段判断
+    # 去掉末尾分隔符后为空说明 dst_root 本身就是空串或根目录，不能拼成根路径下的文件
+    root = dst_root.rstrip(_SEPS)
+    base, ext = os.path.splitext(f"{root}{os.sep}{rel_path}" if root else os.path.join(dst_root, rel_path))
+    limit = max_len - len(ext)
+    if len(base) > limit:
+        base = base[:limit]
+    return base + ext
 
-def resolve_name_conflict(dest_path):
-    base, ext = os.path.splitext(dest_path)
+# 名称缓存按批次创建，批次结束即丢弃；并发批次选中同一名称时由不覆盖的 fast_move 报 FileExistsError 后换名
+dir_contents_lock = threading.Lock()
+
+def snapshot_dir_names(dir_path):
+    # 一次 scandir 得到目录下已有名称（按系统规则统一大小写）
+    try:
+        with os.scandir(dir_path) as it:
+            return {os.path.normcase(entry.name) for entry in it}
+    except OSError:
+        return set()
+
+def resolve_name_conflict(dest_path, dir_contents, name_only=False):
+    # dir_contents: 目录 -> 已占用名称集合，冲突检测不再逐个 stat
+    # name_only 为 True 时只在文件名内加序号和截断（整理用），不会截到目录部分
+    if name_only:
+        dir_part, name_part = os.path.split(dest_path)
+        name_base, ext = os.path.splitext(name_part)
+    else:
+        base, ext = os.path.splitext(dest_path)
     counter = 1
-    while os.path.exists(dest_path):
-        truncated_base = base[:max_filename_length - len(ext) - len(f"_{counter}")]
-        dest_path = f"{truncated_base}_{counter}{ext}"
+    while True:
+        dir_path, name = os.path.split(dest_path)
+        with dir_contents_lock:
+            cached = dir_path in dir_contents
+        if not cached:
+            # scandir 放在锁外，慢目录不会挡住其他线程；并发快照时保留先写入的那份
+            snapshot = snapshot_dir_names(dir_path)
+            with dir_contents_lock:
+                dir_contents.setdefault(dir_path, snapshot)
+        with dir_contents_lock:
+            names = dir_contents[dir_path]
+            if os.path.normcase(name) not in names:
+                names.add(os.path.normcase(name))
+                return dest_path
+        suffix = f"_{counter}"
+        if name_only:
+            dest_path = os.path.join(dir_part, f"{name_base[:max_filename_length - len(suffix)]}{suffix}{ext}")
+        else:
+            truncated_base = base[:max_filename_length - len(ext) - len(suffix)]
+            dest_path = f"{truncated_base}{suffix}{ext}"
         counter += 1
-    return dest_path
 
-def is_allowed_file(file_path):
+def is_allowed_file(file_path, is_dir=None):
     if all_files_selected:
         return True
-    if os.path.isdir(file_path):
+    if is_dir is None:
+        is_dir = os.path.isdir(file_path)
+    if is_dir:
         return folders_selected
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
     return ext in allowed_extensions
 
+def dest_path_for(source_path, dest_root):
+    return _make_dest(os.path.relpath(source_path, source_folder), dest_root, max_filename_length)
+
+# 源目录 -> 尚未转走的条目数（文件 + 子目录），归零时删除该目录
+remaining_entries = {}
+remaining_lock = threading.Lock()
+
+def plan_moves(start_path, dest_root):
+    # 显式栈遍历 start_path，返回 (目录计划, 文件计划, 各目录条目数)
+    # 计划项为 (DirEntry, 目标路径)；只读不改，可先用于预览再交给 move_tree 执行
+    # 栈中同时保存相对 source_folder 的路径前缀，避免每个条目调用 relpath
+    # 只有通过文件夹筛选的目录才登记条目数，未勾选“文件夹”时源目录结构保持不动
+    dir_plan, file_plan, dir_counts = [], [], []
+    sep = os.sep
+    start_rel = os.path.relpath(start_path, source_folder)
+    stack = [(start_path, '' if start_rel == os.curdir else start_rel, start_path != source_folder)]
+    while stack:
+        current, rel_prefix, tracked = stack.pop()
+        count = 0
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    # 子目录总是进入遍历（其中的文件按扩展名单独判断），
+                    # 文件夹筛选只决定是否把目录本身加入目录计划
+                    if not is_dir and not is_allowed_file(entry.path, is_dir):
+                        continue
+                    rel_path = f"{rel_prefix}{sep}{entry.name}" if rel_prefix else entry.name
+                    dest_path = _make_dest(rel_path, dest_root, max_filename_length)
+                    if is_dir:
+                        allowed = is_allowed_file(entry.path, is_dir)
+                        stack.append((entry.path, rel_path, allowed))
+                        if not allowed:
+                            continue
+                        dir_plan.append((entry, dest_path))
+                    else:
+                        file_plan.append((entry, dest_path))
+                    count += 1
+        except OSError as e:
+            logging.warning(f"扫描目录失败，已跳过: {current}, 错误: {e}")
+            continue
+        if tracked:
+            dir_counts.append((current, count))
+    return dir_plan, file_plan, dir_counts
+
+def remove_source_dir(path):
+    try:
+        os.rmdir(path)
+    except OSError:
+        return
+    logging.info(f"已删除空目录: {path}")
+    release_source_entry(os.path.dirname(path))
+
+def release_source_entry(dir_path):
+    # 目录下一项已转走；计数归零则删除该目录并继续向上
+    with remaining_lock:
+        if dir_path not in remaining_entries:
+            return
+        remaining_entries[dir_path] -= 1
+        if remaining_entries[dir_path] > 0:
+            return
+        del remaining_entries[dir_path]
+    remove_source_dir(dir_path)
+
+def move_tree(start_path, dest_root, plan=None):
+    # plan 为 plan_moves 的结果（如转移预览已扫描过），为空时重新扫描
+    if plan is None:
+        plan = plan_moves(start_path, dest_root)
+    dir_plan, file_plan, dir_counts = plan
+    with remaining_lock:
+        remaining_entries.update(dir_counts)
+    for entry, dest_path in dir_plan:
+        try:
+            ensure_directory_exists(dest_path)
+        except OSError as e:
+            # 单个目录建不出来（权限、路径过长等）不影响其余条目，其中的文件转移时会再尝试
+            logging.warning(f"创建目标目录失败: {entry.path} -> {dest_path}, 错误: {e}")
+    for entry, dest_path in file_plan:
+        defer_stability_check(entry.path, dest_path, entry)
+
+    # 规划时就为空的目录直接删除（子目录在前，父目录随之级联）
+    for path in [entry.path for entry, _ in reversed(dir_plan)] + [start_path]:
+        with remaining_lock:
+            drained = remaining_entries.get(path) == 0
+            if drained:
+                del remaining_entries[path]
+        if drained:
+            remove_source_dir(path)
+    return dir_plan, file_plan
+
 def move_with_structure(source_path, dest_root):
     if not os.path.exists(source_path):
         logging.error(f"源路径不存在: {source_path}")
         return
-    if not is_allowed_file(source_path):
+    is_dir = os.path.isdir(source_path)
+    if not is_allowed_file(source_path, is_dir):
         return
 
-    relative_path = os.path.relpath(source_path, source_folder)
-    sanitized_relative_path = sanitize_filename(relative_path)
-    dest_path = os.path.join(dest_root, sanitized_relative_path)
-    dest_path = truncate_path(dest_path)
+    if is_dir:
+        ensure_directory_exists(dest_path_for(source_path, dest_root))
+        move_tree(source_path, dest_root)
+    else:
+        defer_stability_check(source_path, dest_path_for(source_path, dest_root))
+
+# Windows 上文件仍被占用（杀毒软件扫描、下载器未释放句柄）时的错误码
+_TRANSIENT_WINERRORS = {5, 32, 33}  # ACCESS_DENIED, SHARING_VIOLATION, LOCK_VIOLATION
+_TRANSIENT_ERRNOS = {errno.EBUSY, errno.EAGAIN}
+
+def is_transient_error(e, source_path):
+    if isinstance(e, FileNotFoundError):
+        # 源文件已不存在则无需重试；目标目录被删除时重建后重试
+        return os.path.exists(source_path)
+    if isinstance(e, PermissionError):
+        return sys.platform == 'win32'
+    if isinstance(e, OSError):
+        return e.errno in _TRANSIENT_ERRNOS or getattr(e, 'winerror', None) in _TRANSIENT_WINERRORS
+    return False
 
-    if os.path.isdir(source_path):
-        ensure_directory_exists(dest_path)
+def move_file(source_path, dest_path, dir_contents):
+    requested_path = dest_path
+    dest_path = resolve_name_conflict(requested_path, dir_contents)
+    dest_dir = os.path.dirname(dest_path)
+    retry_count = 0
+    conflict_count = 0
+    while True:
         try:
-            items = os.listdir(source_path)
-        except FileNotFoundError:
-            logging.warning(f"目录已不存在，跳过: {source_path}")
-            return
+            ensure_directory_exists(dest_dir)
+            fast_move(source_path, dest_path)
+            logging.debug(f"已转移文件: {source_path} -> {dest_path}")
+            release_source_entry(os.path.dirname(source_path))
+            return True
+        except FileExistsError as e:
+            # 名称缓存之后目标目录被外部写入了同名文件：该名称已记为占用，换下一个
+            conflict_count += 1
+            if conflict_count > 100:
+                logging.error(f"转移失败，目标名称持续冲突: {source_path}, 错误: {e}")
+                return False
+            dest_path = resolve_name_conflict(requested_path, dir_contents)
+            dest_dir = os.path.dirname(dest_path)
+            continue
+        except Exception as e:
+            if not is_transient_error(e, source_path):
+                logging.error(f"转移失败，不再重试: {source_path}, 错误: {e}")
+                return False
+            if isinstance(e, FileNotFoundError):
+                forget_directory(dest_dir)
+            retry_count += 1
+            if retry_count >= retry_attempts:
+                logging.error(f"转移失败，已放弃: {source_path}, 错误: {e}")
+                return False
+            logging.warning(f"转移失败 {retry_count} 次: {e}")
+            time.sleep(min(retry_delay * (2 ** retry_count), max_retry_delay))
 
-        for item in items:
-            move_with_structure(os.path.join(source_path, item), dest_root)
-        if not os.listdir(source_path):
-            os.rmdir(source_path)
-            logging.info(f"已删除空目录: {source_path}")
-    elif os.path.isfile(source_path):
-        if not is_file_stable(source_path):
-            return
-        dest_path = resolve_name_conflict(dest_path)
-        ensure_directory_exists(os.path.dirname(dest_path))
-        retry_count = 0
-        while retry_count < retry_attempts:
-            try:
-                shutil.move(source_path, dest_path)
-                logging.info(f"已转移文件: {source_path} -> {dest_path}")
-                break
-            except Exception as e:
-                retry_count += 1
-                logging.warning(f"转移失败 {retry_count} 次: {e}")
-                time.sleep(retry_delay * (2 ** retry_count))
 def get_optimal_thread_count():
-    return os.cpu_count() or 4
+    # 转移以 I/O 等待为主，线程数可以高于 CPU 核数
+    return min(32, (os.cpu_count() or 4) * 4)
+
+# 每个线程分到的段数：段数多于线程数，先做完的线程会从 executor 队列里继续领取剩余段
+chunks_per_thread = 4
+
+def chunk_by_dest_dir(move_plan, chunk_count):
+    # 按目标目录排序，再尽量沿目录边界切成约 chunk_count 段连续任务；
+    # 每段集中写入少数几个目录，目录元数据缓存命中率更高。
+    # 单个目录文件过多时按段大小拆开，避免整批落到一个线程上
+    ordered = sorted(move_plan, key=lambda item: os.path.dirname(item[1]))
+    target_size = max(1, -(-len(ordered) // max(1, chunk_count)))
+    chunks, current = [], []
+    for _, group in itertools.groupby(ordered, key=lambda item: os.path.dirname(item[1])):
+        current.extend(group)
+        while len(current) >= target_size:
+            chunks.append(current[:target_size])
+            current = current[target_size:]
+    if current:
+        chunks.append(current)
+    return chunks
+
+def move_with_structure_multithreaded(move_plan):
+    thread_count = get_optimal_thread_count()
+    logging.info(f"使用 {thread_count} 个线程进行批量转移")
+    # 失败过多（目标盘满、断开等）时暂停本批，避免每个文件都耗在重试上
+    batch_paused = threading.Event()
+    dir_contents = {}
+    counts = {'done': 0, 'failed': 0}
+    counts_lock = threading.Lock()
 
-def move_files_in_batch(source_paths, dest_root):
-    for source_path in source_paths:
+    def worker(item):
         if stop_event.is_set():
-            break
-        move_with_structure(source_path, dest_root)
+            return None
+        source_path, dest_path = item
+        if batch_paused.is_set():
+            requeue_pending_file(source_path, dest_path, batch_pause_delay)
+            return None
+        try:
+            result = move_file(source_path, dest_path, dir_contents)
+        except Exception as e:
+            logging.error(f"转移异常: {source_path}, 错误: {e}")
+            result = False
+        with counts_lock:
+            counts['done'] += 1
+            if not result:
+                counts['failed'] += 1
+            if (counts['done'] >= batch_failure_min_samples
+                    and counts['failed'] > counts['done'] * batch_failure_ratio
+                    and not batch_paused.is_set()):
+                batch_paused.set()
+                logging.error(f"失败比例过高（{counts['failed']}/{counts['done']}），"
+                              f"本批剩余文件 {batch_pause_delay} 秒后重试")
+        return result
+
+    def run_chunk(chunk):
+        return [worker(item) for item in chunk]
 
-def move_with_structure_multithreaded(source_paths, dest_root):
-    thread_count = get_optimal_thread_count()
-    logging.info(f"使用 {thread_count} 个线程进行批量转移")
-    chunk_size = max(1, len(source_paths) // thread_count)
     with concurrent.futures.ThreadPoolExecutor(max_workers=thread_count) as executor:
-        chunks = [source_paths[i:i + chunk_size] for i in range(0, len(source_paths), chunk_size)]
-        futures = [executor.submit(move_files_in_batch, chunk, dest_root) for chunk in chunks]
-        concurrent.futures.wait(futures)
+        chunks = chunk_by_dest_dir(move_plan, thread_count * chunks_per_thread)
+        results = [r for chunk_results in executor.map(run_chunk, chunks) for r in chunk_results]
+    # 逐个文件的明细只在 DEBUG 级别记录，这里按批次汇总一条
+    logging.info(f"本批转移完成：成功 {results.count(True)} 个，失败 {results.count(False)} 个，"
+                 f"跳过 {results.count(None)} 个，共 {len(results)} 个")
+
+def process_pending_files():
+    stable = collect_stable_files()
+    if stable:
+        move_with_structure_multithreaded(stable)
+
+def wait_for_pending_files():
+    while not stop_event.is_set():
+        with pending_lock:
+            if not pending_files:
+                return
+        time.sleep(0.5)
+        process_pending_files()
 
 class FileEventHandler(FileSystemEventHandler):
-    def on_any_event(self, event):
-        if stop_event.is_set():
-            return
-        if not event.is_directory:
-            if is_file_stable(event.src_path):
-                move_with_structure(event.src_path, target_folder)
-        else:
-            if os.path.exists(event.src_path):
-                move_with_structure(event.src_path, target_folder)
+    # 只处理新建和移入事件；修改/删除事件不会带来新的待转移文件
+    debounce_seconds = 1
 
-def scan_existing_files():
-    logging.info("启动时扫描现有文件...")
-    all_files = [os.path.join(root, file)
-                 for root, _, files in os.walk(source_folder)
-                 for file in files]
-    all_dirs = [os.path.join(root, dir)
-                for root, dirs, _ in os.walk(source_folder)
-                for dir in dirs]
-    move_with_structure_multithreaded(all_dirs + all_files, target_folder)
+    def __init__(self):
+        super().__init__()
+        self.recent_events = {}
+        self.recent_lock = threading.Lock()
+
+    def on_created(self, event):
+        self.handle_path(event.src_path)
+
+    def on_moved(self, event):
+        self.handle_path(event.dest_path)
+
+    def handle_path(self, path):
+        if stop_event.is_set() or is_temporary_file(path):
+            return
+        # 短时间内同一路径的重复事件只处理一次
+        now = time.monotonic()
+        with self.recent_lock:
+            last = self.recent_events.get(path)
+            if last is not None and now - last < self.debounce_seconds:
+                return
+            self.recent_events[path] = now
+            if len(self.recent_events) > 1000:
+                self.recent_events = {p: t for p, t in self.recent_events.items()
+                                      if now - t < self.debounce_seconds}
+        # 文件只登记快照，稳定性由监控循环到期复查，事件线程不再阻塞
+        if os.path.exists(path):
+            move_with_structure(path, target_folder)
 
 def start_monitoring():
     event_handler = FileEventHandler()
@@ -197,14 +586,50 @@ def start_monitoring():
     try:
         while not stop_event.is_set():
             time.sleep(1)
+            process_pending_files()
     except KeyboardInterrupt:
         stop_event.set()
     observer.stop()
     observer.join()
     logging.info("文件监控已停止")
 
+def _do_move(item):
+    src, dst, typ = item
+    try:
+        fast_move(src, dst)
+        logging.debug(f"Moved {typ}: {src} -> {dst}")
+    except Exception as e:
+        logging.error(f"整理失败: {src} -> {dst}, 错误: {e}")
+
+def _do_move_chunk(chunk):
+    for item in chunk:
+        _do_move(item)
+
+# 整理分类文件夹名称
+folder_names = {
+    'zh': {'video': '视频素材', 'image': '图片素材', 'archive': '压缩文件', 'document': '文档文件', 'audio': '音频文件', 'folder': '文件夹', 'other': '杂'},
+    'en': {'video': 'Videos', 'image': 'Images', 'archive': 'Archives', 'document': 'Documents', 'audio': 'Audio', 'folder': 'Folders', 'other': 'Others'}
+}
+
+class OrganizeSignals(QObject):
+    # 整理的扫描和转移在后台线程执行，通过信号回到界面线程弹窗
+    plan_ready = pyqtSignal(dict, list)
+    finished = pyqtSignal(dict)
+
+# 整理进行中标记（只在界面线程读写），防止按钮和托盘菜单重复触发并发整理
+organize_running = False
+
+def _set_organize_running(window, running):
+    global organize_running
+    organize_running = running
+    if window:
+        window.organize_button.setEnabled(not running)
+
 def organize_target_folder(window=None, preview=None):
     global target_folder
+    if organize_running:
+        logging.warning("整理正在进行中，忽略本次请求")
+        return
     app = QtWidgets.QApplication.instance()
     lang = 'zh'
 
@@ -226,68 +651,65 @@ def organize_target_folder(window=None, preview=None):
         logging.error(f"❌ 未设置有效的目标文件夹：[{target_folder}]")
         return
 
-    # 分类后缀
-    video_ext = ['.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm']
-    image_ext = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.svg', '.heic']
-    archive_ext = ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2', '.xz']
-    doc_ext = ['.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.txt', '.rtf']
-    audio_ext = ['.mp3', '.wav', '.aac', '.flac', '.ogg', '.m4a']
+    _set_organize_running(window, True)
+    context = {'target_folder': target_folder, 'lang': lang, 'preview': preview, 'window': window}
+    threading.Thread(target=_build_organize_plan, args=(context,), daemon=True).start()
 
-    folder_names = {
-        'zh': {'video': '视频素材', 'image': '图片素材', 'archive': '压缩文件', 'document': '文档文件', 'audio': '音频文件', 'folder': '文件夹', 'other': '杂'},
-        'en': {'video': 'Videos', 'image': 'Images', 'archive': 'Archives', 'document': 'Documents', 'audio': 'Audio', 'folder': 'Folders', 'other': 'Others'}
-    }
-
-    name = lambda k: folder_names[lang][k]
-    paths = {k: os.path.join(target_folder, name(k)) for k in folder_names[lang]}
+def _build_organize_plan(context):
+    # 后台线程：扫描目标文件夹，生成 move_plan 和分类统计
+    target_folder, lang = context['target_folder'], context['lang']
+    paths = {k: os.path.join(target_folder, v) for k, v in folder_names[lang].items()}
     reserved = list(folder_names[lang].values())
     stats = {k: 0 for k in paths}
 
     # 整理前统计（预览/正式都用）
     move_plan = []
+    dir_contents = {}
+    sep = os.sep
 
-    for item in os.listdir(target_folder):
-        item_path = os.path.join(target_folder, item)
-        if os.path.isdir(item_path) and item not in reserved:
-            dest_path = os.path.join(paths['folder'], item)
-            stats['folder'] += 1
-            move_plan.append((item_path, dest_path, 'folder'))
-
-    for item in os.listdir(target_folder):
-        item_path = os.path.join(target_folder, item)
-        if os.path.isfile(item_path):
-            _, ext = os.path.splitext(item)
-            ext = ext.lower()
-            if ext in video_ext:
-                cat = 'video'
-            elif ext in image_ext:
-                cat = 'image'
-            elif ext in archive_ext:
-                cat = 'archive'
-            elif ext in doc_ext:
-                cat = 'document'
-            elif ext in audio_ext:
-                cat = 'audio'
-            else:
-                cat = 'other'
-            dest_path = os.path.join(paths[cat], sanitize_filename(item))
+    try:
+        with os.scandir(target_folder) as it:
+            entries = list(it)
+    except OSError as e:
+        logging.error(f"读取目标文件夹失败: {target_folder}, 错误: {e}")
+        entries = []
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in reserved:
+                dest_path = resolve_name_conflict(f"{paths['folder']}{sep}{entry.name}", dir_contents,
+                                                  name_only=True)
+                stats['folder'] += 1
+                move_plan.append((entry.path, dest_path, 'folder'))
+        elif entry.is_file():
+            _, ext = os.path.splitext(entry.name)
+            cat = EXT_TO_CAT.get(ext.lower(), 'other')
+            dest_path = resolve_name_conflict(f"{paths[cat]}{sep}{sanitize_filename(entry.name)}",
+                                              dir_contents, name_only=True)
             stats[cat] += 1
-            move_plan.append((item_path, dest_path, 'file'))
+            move_plan.append((entry.path, dest_path, 'file'))
 
-    # 生成汇总信息
+    context['paths'] = paths
+    context['stats'] = stats
+    organize_signals.plan_ready.emit(context, move_plan)
+
+def _on_organize_plan_ready(context, move_plan):
+    # 界面线程：生成汇总信息，预览模式下确认后再启动转移线程
+    preview, stats = context['preview'], context['stats']
     total = sum(stats.values())
-    label_map = folder_names[lang]
+    label_map = folder_names[context['lang']]
     lines = [f"整理{'预览' if preview else '完成'}，共{'识别' if preview else '处理'} {total} 个项目："]
     for k, v in stats.items():
         lines.append(f"- {label_map[k]}：{v} 个")
-    summary = '\n'.join(lines)
+    context['total'] = total
+    context['summary'] = '\n'.join(lines)
 
     if preview:
         # 弹出预览确认框
         msg_box = QtWidgets.QMessageBox()
         msg_box.setWindowTitle("整理预览")
         msg_box.setIcon(QtWidgets.QMessageBox.Information)
-        msg_box.setText(summary)
+        msg_box.setText(context['summary'])
         msg_box.setStandardButtons(QtWidgets.QMessageBox.Ok | QtWidgets.QMessageBox.Cancel)
         msg_box.button(QtWidgets.QMessageBox.Ok).setText("开始")
         msg_box.button(QtWidgets.QMessageBox.Cancel).setText("取消")
@@ -295,23 +717,29 @@ def organize_target_folder(window=None, preview=None):
         result = msg_box.exec_()
         if result != QtWidgets.QMessageBox.Ok:
             logging.info("用户取消了整理操作（预览模式下）")
+            _set_organize_running(context['window'], False)
             return
 
-    # 正式执行整理
-    for key in paths:
-        ensure_directory_exists(paths[key])
-    for src, dst, typ in move_plan:
-        try:
-            shutil.move(src, dst)
-            logging.info(f"Moved {typ}: {src} -> {dst}")
-        except Exception as e:
-            logging.error(f"整理失败: {src} -> {dst}, 错误: {e}")
+    threading.Thread(target=_execute_organize_plan, args=(context, move_plan), daemon=True).start()
+
+def _execute_organize_plan(context, move_plan):
+    # 后台线程：正式执行整理，分类目录先建好，工作线程不会同时 makedirs
+    for path in context['paths'].values():
+        forget_directory(path)  # 分类文件夹可能在上次整理后被用户删除或移走
+        ensure_directory_exists(path)
+    thread_count = get_optimal_thread_count()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=thread_count) as executor:
+        list(executor.map(_do_move_chunk, chunk_by_dest_dir(move_plan, thread_count * chunks_per_thread)))
+    organize_signals.finished.emit(context)
+
+def _on_organize_finished(context):
+    _set_organize_running(context['window'], False)
 
     # 完成提示
     final_msg = QtWidgets.QMessageBox()
     final_msg.setWindowTitle("整理完成")
     final_msg.setIcon(QtWidgets.QMessageBox.Information)
-    final_msg.setText(summary)
+    final_msg.setText(context['summary'])
     final_msg.setStandardButtons(QtWidgets.QMessageBox.Ok)
     final_msg.exec_()
 
@@ -319,27 +747,32 @@ def organize_target_folder(window=None, preview=None):
     if tray_icon:
         tray_icon.showMessage(
             "📂 整理完成",
-            f"已完成整理，共 {total} 项",
+            f"已完成整理，共 {context['total']} 项",
             QtWidgets.QSystemTrayIcon.Information,
             5000
         )
 
-    logging.info(summary)
+    logging.info(context['summary'])
 
+organize_signals = OrganizeSignals()
+organize_signals.plan_ready.connect(_on_organize_plan_ready, Qt.QueuedConnection)
+organize_signals.finished.connect(_on_organize_finished, Qt.QueuedConnection)
 
-def scan_existing_files():
+
+def scan_existing_files(plan=None):
+    if not source_folder:
+        logging.warning("未设置源文件夹，跳过扫描")
+        return
+    if not target_folder or not os.path.isdir(target_folder):
+        logging.warning(f"目标文件夹无效，跳过扫描: [{target_folder}]")
+        return
     logging.info("启动时扫描现有文件...")
-    all_files = [os.path.join(root, file)
-                 for root, _, files in os.walk(source_folder)
-                 for file in files]
-    all_dirs = [os.path.join(root, dir)
-                for root, dirs, _ in os.walk(source_folder)
-                for dir in dirs]
-    move_with_structure_multithreaded(all_dirs + all_files, target_folder)
+    dir_plan, file_plan = move_tree(source_folder, target_folder, plan)
+    wait_for_pending_files()
 
     # 🔔 托盘通知
     if tray_icon:
-        total = len(all_dirs + all_files)
+        total = len(dir_plan) + len(file_plan)
         tray_icon.showMessage(
             "✅ 同步完成",
             f"共转移 {total} 项文件/文件夹",
@@ -353,10 +786,13 @@ class FileMoverApp(QtWidgets.QWidget):
         super().__init__()
         self.initUI()
 
-        # UI 初始化结尾加入监控定时器
-        self.input_monitor_timer = QTimer()
-        self.input_monitor_timer.timeout.connect(self.monitor_inputs)
-        self.input_monitor_timer.start(5000)    
+        # 输入框内容变化时才记录，停止输入 500ms 后记录一次
+        self.input_log_timer = QTimer(self)
+        self.input_log_timer.setSingleShot(True)
+        self.input_log_timer.setInterval(500)
+        self.input_log_timer.timeout.connect(self.monitor_inputs)
+        self.source_input.textChanged.connect(lambda _: self.input_log_timer.start())
+        self.target_input.textChanged.connect(lambda _: self.input_log_timer.start())
 
     def initUI(self):
         self.setWindowTitle("文件转移工具")
@@ -507,46 +943,39 @@ class FileMoverApp(QtWidgets.QWidget):
 
     def on_file_type_changed(self):
         global allowed_extensions, all_files_selected, folders_selected
-        all_files_selected = self.all_files_checkbox.isChecked()
+        all_selected = self.all_files_checkbox.isChecked()
+        extensions = frozenset()
+        if not all_selected:
+            extensions = frozenset().union(*(file_type_map[label]
+                                             for label, cb in self.checkboxes.items()
+                                             if cb.isChecked() and label in file_type_map))
+
+        # 先构建好新集合再一次性赋值，最后才切换 all_files_selected，
+        # 工作线程不会读到空集合或构建一半的集合
+        allowed_extensions = extensions
         folders_selected = self.checkboxes['文件夹'].isChecked()
-        allowed_extensions = []
-
-        if not all_files_selected:
-            for label, cb in self.checkboxes.items():
-                if cb.isChecked() and label in file_type_map:
-                    allowed_extensions.extend(file_type_map[label])
+        all_files_selected = all_selected
     def run_transfer_preview(self):
         global source_folder, allowed_extensions, all_files_selected, folders_selected
 
         source_folder = self.source_input.text()
         if not source_folder or not os.path.exists(source_folder):
             QtWidgets.QMessageBox.warning(self, "错误", "未设置有效的源文件夹")
-            return False
+            return False, None
 
         # 构建分类统计
         stats = {
             '音频文件': 0, '图片文件': 0, '视频文件': 0, '压缩文件': 0, '文件夹': 0, '其他': 0
         }
 
-        for root, dirs, files in os.walk(source_folder):
-            for file in files:
-                path = os.path.join(root, file)
-                _, ext = os.path.splitext(file)
-                ext = ext.lower()
-
-                matched = False
-                for label, exts in file_type_map.items():
-                    if ext in exts:
-                        if all_files_selected or ext in allowed_extensions:
-                            stats[label] += 1
-                            matched = True
-                        break
-                if not matched and all_files_selected:
-                    stats['其他'] += 1
-
-            if folders_selected:
-                for d in dirs:
-                    stats['文件夹'] += 1
+        # 与正式同步使用同一份扫描结果，确认后直接交给 scan_existing_files
+        plan = plan_moves(source_folder, target_folder)
+        dir_plan, file_plan, _ = plan
+        for entry, _ in file_plan:
+            _, ext = os.path.splitext(entry.name)
+            stats[EXT_TO_LABEL.get(ext.lower(), '其他')] += 1
+        if folders_selected:
+            stats['文件夹'] += len(dir_plan)
 
         total = sum(stats.values())
         lines = [f"将从源文件夹转移：共识别 {total} 项"]
@@ -568,7 +997,7 @@ class FileMoverApp(QtWidgets.QWidget):
         cancel_button.setText("取消")
 
         result = msg_box.exec_()
-        return result == QtWidgets.QMessageBox.Ok
+        return result == QtWidgets.QMessageBox.Ok, plan
 
 
     def stop_sync(self):
@@ -587,14 +1016,20 @@ class FileMoverApp(QtWidgets.QWidget):
         stability_check_attempts = self.stability_attempts_input.value()
 
         if source_folder and target_folder:
+            plan = None
             if self.preview_checkbox.isChecked():
-                proceed = self.run_transfer_preview()
+                proceed, plan = self.run_transfer_preview()
                 if not proceed:
                     return  # 用户取消或关闭窗口，不执行同步
 
+            # 上次同步遗留的待检测文件和目录计数记录的是旧目标路径，重新开始前清空
+            with pending_lock:
+                pending_files.clear()
+            with remaining_lock:
+                remaining_entries.clear()
             stop_event.clear()
             self.hide()
-            threading.Thread(target=scan_existing_files, daemon=True).start()
+            threading.Thread(target=scan_existing_files, args=(plan,), daemon=True).start()
             threading.Thread(target=start_monitoring, daemon=True).start()
             logging.info("已启动同步任务")      
 
@@ -614,7 +1049,7 @@ def create_tray(app, window):
 
     action_show.triggered.connect(lambda: window.show())
     action_log.triggered.connect(lambda: os.startfile(log_file_path))
-    action_rescan.triggered.connect(scan_existing_files)
+    action_rescan.triggered.connect(lambda: threading.Thread(target=scan_existing_files, daemon=True).start())
     action_organize.triggered.connect(organize_target_folder)
     action_exit.triggered.connect(lambda: stop_event.set())
     action_exit.triggered.connect(app.quit)
@@ -644,10 +1079,12 @@ def send_to_running_instance(folder_arg, mode):
         return True
     return False
 
+_DRIVE_RE = re.compile(r"^([A-Z]:)[\\/]?$", re.IGNORECASE)
+
 def clean_folder_path(path):
     path = path.strip('"').strip("'")              # 去除两侧引号
     path = path.replace("/", "\\")                 # 替换斜杠为反斜杠
-    match = re.match(r"^([A-Z]:)[\\/]?$", path, re.IGNORECASE)
+    match = _DRIVE_RE.match(path)
     if match:
         return match.group(1) + "\\"
     return os.path.normpath(path)